@@ -0,0 +1,205 @@
+import argparse
+import multiprocessing as mp
+import os
+import threading
+import time
+from pathlib import Path
+
+import librosa
+import numpy as np
+import psutil
+import torch
+
+# Benchmarks the XTTS inference modes from tts_inference.py on a fixed set of
+# Chinese sentences. For each mode it reports the real-time factor (synthesis
+# time / audio duration, lower is better), RSS after loading and peak RSS while
+# synthesising, then checks that the optimized audio still matches fp32.
+#
+# Each mode runs in its own process. The rows are ordered so that each one adds
+# a single optimization on top of the previous one:
+#   fp32 -> fp32_threads (thread tuning) -> cpu_optimized (int8 GPT)
+#   -> cpu_optimized_bf16 (bfloat16 vocoder)
+# XTTS inference already runs under torch.inference_mode in every mode, so the
+# explicit wrapper in cpu_optimized is not a separate optimization.
+#
+# Quality check: every mode decodes greedily (do_sample=False), so fp32 output
+# is deterministic and differences come from the optimization alone. Each clip
+# is compared to fp32 by the mean distance between DTW-aligned MFCC frames,
+# which grows when words are garbled or dropped. The pass threshold is the
+# distance between two sampled fp32 renditions of the same sentence, i.e. the
+# variation the unmodified model already produces.
+
+SENTENCES = [
+    "你好，我是ku，很高兴认识你。",
+    "今天天气不错，我们一起去公园散散步吧。",
+    "这个周末你有什么安排吗？我打算在家看书。",
+    "刚才那家餐厅的菜有点咸，不过服务还挺好的。",
+    "如果明天下雨的话，我们就改天再约吧。",
+]
+
+BENCHMARK_MODES = {
+    "fp32": {"mode": "fp32"},
+    "fp32_threads": {"mode": "fp32", "tune_threads": True},
+    "cpu_optimized": {"mode": "cpu_optimized"},
+    "cpu_optimized_bf16": {"mode": "cpu_optimized", "bf16_vocoder": True},
+}
+
+DEFAULT_SPEAKER = "Claribel Dervla"  # Built-in xtts_v2 voice if no sample is available
+
+
+class _PeakRSSSampler(threading.Thread):
+    # Polls the process RSS in the background; ru_maxrss would only report the
+    # lifetime peak, which is reached while the fp32 checkpoint is loading
+    def __init__(self, interval=0.005):
+        super().__init__(daemon=True)
+        self.process = psutil.Process()
+        self.interval = interval
+        self.peak = self.process.memory_info().rss
+        self.finished = threading.Event()
+
+    def run(self):
+        while not self.finished.wait(self.interval):
+            self.peak = max(self.peak, self.process.memory_info().rss)
+
+    def stop(self):
+        self.finished.set()
+        self.join()
+        return max(self.peak, self.process.memory_info().rss)
+
+
+def _wav_path(output_dir, label, i):
+    return Path(output_dir) / f"{label}_{i}.npy"
+
+
+def _run_mode(label, num_threads, speaker_wav, output_dir, queue):
+    from tts_inference import load_xtts, synthesis_context
+
+    config = BENCHMARK_MODES[label]
+    tts = load_xtts(num_threads=num_threads, **config)
+    sample_rate = tts.synthesizer.output_sample_rate
+    if speaker_wav and os.path.exists(speaker_wav):
+        speaker_kwargs = {"speaker_wav": speaker_wav}
+    else:
+        speaker_kwargs = {"speaker": DEFAULT_SPEAKER}
+
+    def synthesize(sentence, **kwargs):
+        with synthesis_context(config["mode"]):
+            wav = tts.tts(text=sentence, language="zh-cn", **speaker_kwargs, **kwargs)
+        return np.asarray(wav, dtype=np.float32)
+
+    loaded_rss = psutil.Process().memory_info().rss
+    # Warm-up so one-off allocation / kernel selection is not timed
+    synthesize(SENTENCES[0], do_sample=False)
+
+    sampler = _PeakRSSSampler()
+    sampler.start()
+    synthesis_seconds = 0.0
+    audio_seconds = 0.0
+    for i, sentence in enumerate(SENTENCES):
+        start = time.perf_counter()
+        wav = synthesize(sentence, do_sample=False)
+        synthesis_seconds += time.perf_counter() - start
+        audio_seconds += len(wav) / sample_rate
+        np.save(_wav_path(output_dir, label, i), wav)
+    peak_rss = sampler.stop()
+
+    if label == "fp32":
+        # Two sampled renditions per sentence set the quality threshold (not timed)
+        for i, sentence in enumerate(SENTENCES):
+            for run in range(2):
+                torch.manual_seed(2 * i + run)
+                np.save(_wav_path(output_dir, f"fp32_sampled{run}", i), synthesize(sentence))
+
+    queue.put({
+        "mode": label,
+        "sample_rate": sample_rate,
+        "rtf": synthesis_seconds / audio_seconds,
+        "loaded_mb": loaded_rss / 2**20,
+        "synthesis_peak_mb": peak_rss / 2**20,
+    })
+
+
+def cepstral_distance(reference, candidate, sample_rate):
+    # Mean Euclidean distance between DTW-aligned MFCC frames, excluding c0
+    # (loudness). Only meaningful relative to the fp32 threshold below.
+    ref = librosa.feature.mfcc(y=reference, sr=sample_rate, n_mfcc=14)[1:]
+    cand = librosa.feature.mfcc(y=candidate, sr=sample_rate, n_mfcc=14)[1:]
+    _, path = librosa.sequence.dtw(X=ref, Y=cand, metric="euclidean")
+    diff = ref[:, path[:, 0]] - cand[:, path[:, 1]]
+    return float(np.mean(np.linalg.norm(diff, axis=0)))
+
+
+def fp32_threshold(output_dir, sample_rate):
+    # Mean distance between two sampled fp32 renditions of each sentence
+    distances = [
+        cepstral_distance(np.load(_wav_path(output_dir, "fp32_sampled0", i)),
+                          np.load(_wav_path(output_dir, "fp32_sampled1", i)), sample_rate)
+        for i in range(len(SENTENCES))
+    ]
+    return sum(distances) / len(distances)
+
+
+def compare_to_fp32(label, output_dir, sample_rate):
+    distances = []
+    duration_ratios = []
+    for i in range(len(SENTENCES)):
+        reference = np.load(_wav_path(output_dir, "fp32", i))
+        candidate = np.load(_wav_path(output_dir, label, i))
+        distances.append(cepstral_distance(reference, candidate, sample_rate))
+        duration_ratios.append(len(candidate) / len(reference))
+    return sum(distances) / len(distances), sum(duration_ratios) / len(duration_ratios)
+
+
+def run_benchmark(modes, num_threads=None, speaker_wav=None, output_dir="tts_benchmark_output"):
+    os.makedirs(output_dir, exist_ok=True)
+    # fp32 always runs first as the reference for the quality check
+    modes = ["fp32"] + [mode for mode in BENCHMARK_MODES if mode in modes and mode != "fp32"]
+
+    ctx = mp.get_context("spawn")
+    results = []
+    for label in modes:
+        print(f"Benchmarking {label}...")
+        queue = ctx.Queue()
+        process = ctx.Process(target=_run_mode, args=(label, num_threads, speaker_wav, output_dir, queue))
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            print(f"Error: {label} benchmark exited with code {process.exitcode}. Skipping.")
+            continue
+        results.append(queue.get())
+
+    if not results or results[0]["mode"] != "fp32":
+        print("Error: fp32 reference run failed, cannot compare modes.")
+        return False
+
+    sample_rate = results[0]["sample_rate"]
+    threshold = fp32_threshold(output_dir, sample_rate)
+
+    print(f"\n{'mode':<22}{'RTF':>8}{'load MB':>10}{'synth peak MB':>15}{'distance':>10}{'dur ratio':>11}")
+    all_passed = True
+    for result in results:
+        row = (f"{result['mode']:<22}{result['rtf']:>8.2f}{result['loaded_mb']:>10.0f}"
+               f"{result['synthesis_peak_mb']:>15.0f}")
+        if result["mode"] == "fp32":
+            print(f"{row}{'-':>10}{'-':>11}")
+            continue
+        distance, duration_ratio = compare_to_fp32(result["mode"], output_dir, sample_rate)
+        passed = distance <= threshold
+        all_passed = all_passed and passed
+        print(f"{row}{distance:>10.2f}{duration_ratio:>11.2f}  {'PASS' if passed else 'FAIL'}")
+
+    print("\nRTF < 1.0 means faster than real time. Peak MB is RSS during the synthesis loop.")
+    print(f"Distance threshold (fp32 sampled-vs-sampled): {threshold:.2f}")
+    return all_passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark XTTS CPU inference modes against fp32.")
+    parser.add_argument("--modes", nargs="+", choices=list(BENCHMARK_MODES), default=list(BENCHMARK_MODES))
+    parser.add_argument("--threads", type=int, default=None, help="Intra-op threads for every mode with thread tuning")
+    parser.add_argument("--speaker-wav", default="recording_sample.WAV")
+    parser.add_argument("--output-dir", default="tts_benchmark_output")
+    args = parser.parse_args()
+
+    if not run_benchmark(args.modes, args.threads, args.speaker_wav, args.output_dir):
+        exit(1)
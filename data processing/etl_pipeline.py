@@ -0,0 +1,346 @@
+import argparse
+import json
+from collections import Counter
+from itertools import chain
+from pathlib import Path
+
+from xlsx_stream import CHUNK_SIZE, XlsxStreamReader
+
+# Single entry point for the chat-log ETL: every workbook is parsed once and its
+# rows are streamed through the stages below, so the alpaca and ShareGPT outputs
+# are produced from the same pass instead of re-globbing the directory per format.
+# Rows travel in fixed-size chunks straight from the sheet XML (see xlsx_stream.py),
+# so the row buffers are bounded by the chunk size rather than by the sheet.
+#
+#   read_sheets -> filter_min_rows -> detect_columns -> segment_conversations
+#       -> emitters (AlpacaEmitter, ShareGPTEmitter, StatsEmitter)
+#
+# Workbooks are never modified or deleted; sheets that are too short are skipped.
+
+MIN_LINES = 7  # Minimum rows for a sheet to carry enough conversational context
+ALPACA_INSTRUCTION = "你是ku。请根据提供的对话上下文和用户最新的发言，以ku的身份和风格进行回应。"
+SHAREGPT_SYSTEM_PROMPT = "你是ku。请根据对话内容自然回应。"
+
+# (speaker, content) header pairs, in order of preference
+COLUMN_CANDIDATES = [
+    ('发送人', '内容'),
+    ('Speaker', 'Content'),
+    ('发言人', '内容'),
+]
+
+
+def _clean(value):
+    # Empty Excel cells come back as None
+    if value is None:
+        return ""
+    return str(value).strip()
+
+
+def _candidate_columns(columns):
+    # Columns find_columns may pick: every named candidate present, plus the
+    # B/C index fallback. Only these are decoded, e.g. the timestamp column never is.
+    names = {name for pair in COLUMN_CANDIDATES for name in pair}
+    return {i for i, column in enumerate(columns) if column in names} | {1, 2}
+
+
+def _peek_rows(sheet, min_rows):
+    # Pull chunks until at least min_rows rows are buffered, then put them back
+    # in front of the stream. Returns the buffered rows (at most a few chunks).
+    chunks = sheet["chunks"]
+    buffered = []
+    num_rows = 0
+    for chunk in chunks:
+        buffered.append(chunk)
+        num_rows += len(chunk)
+        if num_rows >= min_rows:
+            break
+    sheet["chunks"] = chain(buffered, chunks)
+    return [row for chunk in buffered for row in chunk]
+
+
+def _guard_chunks(chunks, source, stats, status):
+    # A malformed sheet only fails once it is read. Stop that sheet and flag it
+    # so later stages skip it and run_pipeline aborts its conversation, rather
+    # than letting the error end the whole run.
+    try:
+        yield from chunks
+    except Exception as e:
+        print(f"Error parsing {source}: {e}")
+        stats["sheet_errors"] += 1
+        status["failed"] = True
+
+
+# --- Stage 1: read each workbook once ---
+
+def read_sheets(input_dir, stats, chunk_size=CHUNK_SIZE):
+    for xlsx_file in sorted(Path(input_dir).glob('*.xlsx')):
+        try:
+            reader = XlsxStreamReader(xlsx_file)
+        except Exception as e:
+            print(f"Error reading Excel file {xlsx_file}: {e}")
+            stats["workbook_errors"] += 1
+            continue
+        stats["workbooks"] += 1
+
+        with reader:
+            for sheet_index, sheet_name in enumerate(reader.sheet_names):
+                source = f"{xlsx_file}, sheet {sheet_name}"
+                try:
+                    columns, chunks = reader.iter_chunks(sheet_name, chunk_size, usecols=_candidate_columns)
+                except Exception as e:
+                    print(f"Error parsing sheet {sheet_name} in file {xlsx_file}: {e}")
+                    stats["sheet_errors"] += 1
+                    continue
+                stats["sheets"] += 1
+
+                status = {"failed": False}
+                yield {
+                    "workbook": xlsx_file,
+                    "sheet": sheet_name,
+                    "sheet_index": sheet_index,
+                    "columns": columns,
+                    "chunks": _guard_chunks(chunks, source, stats, status),
+                    "status": status,
+                }
+
+
+# --- Stage 2: skip sheets with too few rows (the workbook itself is left alone) ---
+
+def filter_min_rows(sheets, min_lines, stats):
+    for sheet in sheets:
+        # Only buffers min_lines rows, never the whole sheet
+        num_rows = len(_peek_rows(sheet, min_lines))
+        if sheet["status"]["failed"]:  # Already reported as a sheet error
+            continue
+        if num_rows < min_lines:
+            print(f"Skipping {sheet['workbook'].name}, sheet {sheet['sheet']} - {num_rows} rows")
+            stats["sheets_too_small"] += 1
+            continue
+        yield sheet
+
+
+# --- Stage 3: find the speaker and content columns ---
+
+def find_columns(columns, rows, source):
+    for speaker_name, content_name in COLUMN_CANDIDATES:
+        if speaker_name in columns and content_name in columns:
+            if speaker_name == '发言人':
+                print(f"Warning: Using '发言人' and '内容' for columns in {source} as '发送人' was not found.")
+            return columns.index(speaker_name), columns.index(content_name)
+
+    # Fall back to column indices B and C (1 and 2) if they are not entirely empty
+    if len(columns) < 3:
+        print(f"Could not find required columns ('发送人', '内容', or fallbacks) in {source}. Available columns: {columns}")
+        return None
+    print(f"Warning: Columns '发送人' and '内容' not found in {source}. Falling back to column indices 1 (for speaker) and 2 (for content). Available columns: {columns}")
+    if all(_clean(row[1]) == "" for row in rows) or all(_clean(row[2]) == "" for row in rows):
+        print(f"Fallback to column indices 1 and 2 failed for {source} as they appear empty.")
+        return None
+    return 1, 2
+
+
+def detect_columns(sheets, stats):
+    for sheet in sheets:
+        source = f"{sheet['workbook']}, sheet {sheet['sheet']}"
+        # Decide from the header and the first chunk only
+        rows = _peek_rows(sheet, 1)
+        if sheet["status"]["failed"]:
+            continue
+        found = find_columns(sheet["columns"], rows, source)
+        if found is None:
+            print(f"Skipping {source}.")
+            stats["sheets_missing_columns"] += 1
+            continue
+        sheet["speaker_idx"], sheet["content_idx"] = found
+        yield sheet
+
+
+# --- Stage 4: turn rows into per-sheet conversations ---
+
+def _iter_messages(sheet):
+    speaker_idx = sheet["speaker_idx"]
+    content_idx = sheet["content_idx"]
+    for chunk in sheet["chunks"]:
+        for row in chunk:
+            content = _clean(row[content_idx])
+            if not content:  # Skip empty messages
+                continue
+            speaker = _clean(row[speaker_idx])
+            # Ku's own messages have an empty sender cell
+            role = "ku" if not speaker or speaker.lower() == "ku" else "user"
+            yield {"role": role, "sender": speaker, "content": content}
+
+
+def segment_conversations(sheets):
+    for sheet in sheets:
+        contact_name = sheet["workbook"].stem
+        if sheet["sheet_index"] == 0:
+            conversation_id = f"{contact_name}_chat_log"
+        else:
+            conversation_id = f"{contact_name}_{sheet['sheet']}_chat_log"
+        yield {
+            "id": conversation_id,
+            "source": f"{sheet['workbook'].name}, sheet {sheet['sheet']}",
+            "messages": _iter_messages(sheet),
+            "status": sheet["status"],
+        }
+
+
+# --- Stage 5: format emitters ---
+# Each emitter sees every conversation through begin() / message() / end(),
+# so any number of output formats share a single pass over the rows. If the
+# sheet fails partway through, abort() is called instead of end() and the
+# emitter drops everything it took from that conversation.
+
+class AlpacaEmitter:
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self.items = []
+        self.user_input_buffer = []
+        self.conversation_start = 0
+
+    def begin(self, conversation):
+        self.user_input_buffer = []
+        self.conversation_start = len(self.items)
+
+    def message(self, message):
+        # Alpaca keeps its original rule: any non-empty sender, even "ku", is user input
+        if message["sender"]:
+            self.user_input_buffer.append(message["content"])
+        elif self.user_input_buffer:  # Ku responds to pending user input
+            self.items.append({
+                "instruction": ALPACA_INSTRUCTION,
+                "input": "\n".join(self.user_input_buffer),
+                "output": message["content"],
+                "system": "",
+                "history": []
+            })
+            self.user_input_buffer = []
+
+    def end(self):
+        # Trailing user messages without a Ku response are dropped
+        self.user_input_buffer = []
+
+    def abort(self):
+        del self.items[self.conversation_start:]
+        self.user_input_buffer = []
+
+    def write(self):
+        with open(self.output_file, 'w', encoding='utf-8') as f:
+            json.dump(self.items, f, ensure_ascii=False, indent=2)
+        print(f"Successfully converted {len(self.items)} entries to {self.output_file}")
+
+
+class ShareGPTEmitter:
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self.conversations = []
+        self.current = None
+        self.source = None
+
+    def begin(self, conversation):
+        self.current = {
+            "id": conversation["id"],
+            "conversations": [{"from": "system", "value": SHAREGPT_SYSTEM_PROMPT}]
+        }
+        self.source = conversation["source"]
+
+    def message(self, message):
+        self.current["conversations"].append({"from": message["role"], "value": message["content"]})
+
+    def end(self):
+        if len(self.current["conversations"]) > 1:  # More than just the system prompt
+            self.conversations.append(self.current)
+        else:
+            print(f"Skipping {self.source}: No actual messages found after system prompt.")
+        self.current = None
+
+    def abort(self):
+        self.current = None
+
+    def write(self):
+        with open(self.output_file, 'w', encoding='utf-8') as f:
+            json.dump(self.conversations, f, ensure_ascii=False, indent=2)
+        print(f"Successfully converted {len(self.conversations)} conversations to {self.output_file}")
+
+
+# --- Stage 6: stats ---
+
+class StatsEmitter:
+    def __init__(self, stats):
+        self.stats = stats
+        self.current = Counter()
+
+    def begin(self, conversation):
+        self.current = Counter()
+
+    def message(self, message):
+        self.current["messages"] += 1
+        self.current[f"{message['role']}_messages"] += 1
+
+    def end(self):
+        self.stats["conversations"] += 1
+        self.stats.update(self.current)
+
+    def abort(self):
+        self.current = Counter()
+
+    def write(self):
+        print("\nPipeline stats:")
+        for key in ("workbooks", "workbook_errors", "sheets", "sheet_errors",
+                    "sheets_too_small", "sheets_missing_columns", "conversations",
+                    "messages", "user_messages", "ku_messages"):
+            print(f"  {key}: {self.stats[key]}")
+
+
+def run_pipeline(input_dir, alpaca_output=None, sharegpt_output=None, min_lines=MIN_LINES, chunk_size=CHUNK_SIZE):
+    stats = Counter()
+    emitters = []
+    if alpaca_output:
+        emitters.append(AlpacaEmitter(alpaca_output))
+    if sharegpt_output:
+        emitters.append(ShareGPTEmitter(sharegpt_output))
+    emitters.append(StatsEmitter(stats))
+
+    sheets = read_sheets(input_dir, stats, chunk_size)
+    sheets = filter_min_rows(sheets, min_lines, stats)
+    sheets = detect_columns(sheets, stats)
+
+    for conversation in segment_conversations(sheets):
+        for emitter in emitters:
+            emitter.begin(conversation)
+        for message in conversation["messages"]:
+            for emitter in emitters:
+                emitter.message(message)
+        for emitter in emitters:
+            if conversation["status"]["failed"]:
+                emitter.abort()
+            else:
+                emitter.end()
+
+    for emitter in emitters:
+        emitter.write()
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert chat-log workbooks to alpaca and/or ShareGPT JSON in one pass.")
+    parser.add_argument("--input-dir", default="avatar training data")
+    parser.add_argument("--alpaca-output", default="alpaca_formatted_data.json")
+    parser.add_argument("--sharegpt-output", default="all_conversations_sharegpt.json")
+    parser.add_argument("--formats", nargs="+", choices=["alpaca", "sharegpt"], default=["alpaca", "sharegpt"])
+    parser.add_argument("--min-lines", type=int, default=MIN_LINES)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows read from a sheet at a time")
+    args = parser.parse_args()
+
+    if not Path(args.input_dir).is_dir():
+        print(f"Error: Input directory '{args.input_dir}' not found.")
+        exit(1)
+
+    run_pipeline(
+        args.input_dir,
+        alpaca_output=args.alpaca_output if "alpaca" in args.formats else None,
+        sharegpt_output=args.sharegpt_output if "sharegpt" in args.formats else None,
+        min_lines=args.min_lines,
+        chunk_size=args.chunk_size,
+    )
@@ -3,11 +3,7 @@ import streamlit as st
 import json
 import os # Added for TTS
 import tempfile # Added for TTS
-from TTS.api import TTS # Added for TTS
-import torch # Added for PyTorch 2.6+ TTS model loading fix
-from TTS.tts.configs import xtts_config # Changed import for PyTorch 2.6+ fix
-from TTS.tts.models.xtts import XttsAudioConfig, XttsArgs # Added XttsArgs
-from TTS.config.shared_configs import BaseDatasetConfig # Added for the new class
+from tts_inference import load_xtts, synthesis_context # XTTS loading and CPU inference modes
 import base64 # Added for base64 encoding
 import re # Added for regex pattern matching
 from dotenv import load_dotenv # Added for loading environment variables
@@ -39,6 +35,11 @@ model_configs = {
 
 # Default system prompt to be added to all conversations
 DEFAULT_SYSTEM_PROMPT = "你是ku。请根据提供的对话上下文和用户最新的发言，以ku的身份和风格进行回应。"
+
+# TTS inference mode: "fp32" (default) or "cpu_optimized" (int8 GPT, tuned threads)
+TTS_INFERENCE_MODE = os.getenv("TTS_INFERENCE_MODE", "fp32")
+TTS_NUM_THREADS = os.getenv("TTS_NUM_THREADS", "").strip() # Parsed in load_tts_model; empty / 0 keeps torch's default
+TTS_BF16_VOCODER = os.getenv("TTS_BF16_VOCODER", "false").lower() == "true" # Only used by cpu_optimized
 # --- Configuration END ---
 
 client = OpenAI(api_key=api_key, base_url=api_base)
@@ -46,27 +47,17 @@ client = OpenAI(api_key=api_key, base_url=api_base)
 # --- TTS Initialization ---
 SPEAKER_WAV_PATH = "recording_sample.WAV" # Relative to this script
 
-# Add XttsConfig to safe globals for PyTorch 2.6+
-# This needs to be done before TTS model loading if PyTorch version is >= 2.6
-# and the model uses this config class.
-torch.serialization.add_safe_globals([xtts_config.XttsConfig]) # Use direct module reference
-
 @st.cache_resource # Cache the TTS model for performance
 def load_tts_model():
     # Consider gpu=True if on a compatible CUDA environment and want faster synthesis
     # For M1 Mac, PyTorch MPS can sometimes be used if TTS/PyTorch versions support it well.
     # Sticking to gpu=False (CPU) for broader compatibility initially.
     # Model will be downloaded on first run if not already cached by TTS library
+    # Set TTS_INFERENCE_MODE=cpu_optimized for faster CPU synthesis (see benchmark_tts.py)
     try:
-        # Use safe_globals context manager directly around the TTS model instantiation
-        with torch.serialization.safe_globals([
-            xtts_config.XttsConfig, 
-            XttsAudioConfig, 
-            BaseDatasetConfig,
-            XttsArgs # Added new class
-        ]):
-            model = TTS("tts_models/multilingual/multi-dataset/xtts_v2", gpu=False)
-        return model
+        # Parsed here so a bad value is reported through st.error below instead of stopping the app
+        num_threads = int(TTS_NUM_THREADS or 0) or None
+        return load_xtts(TTS_INFERENCE_MODE, num_threads=num_threads, bf16_vocoder=TTS_BF16_VOCODER)
     except Exception as e:
         st.error(f"Failed to load TTS model: {e}")
         return None
@@ -349,20 +340,21 @@ if st.session_state.waiting_for_response:
                     output_audio_path = tmp_audio_file.name
                 
                 # Generate TTS audio
-                if speaker_arg:
-                    tts_model.tts_to_file(
-                        text=assistant_response,
-                        speaker_wav=speaker_arg,
-                        language=tts_language,
-                        file_path=output_audio_path
-                    )
-                else:
-                    # Fallback if speaker_wav is missing
-                    tts_model.tts_to_file(
-                        text=assistant_response,
-                        language=tts_language,
-                        file_path=output_audio_path
-                    )
+                with synthesis_context(TTS_INFERENCE_MODE):
+                    if speaker_arg:
+                        tts_model.tts_to_file(
+                            text=assistant_response,
+                            speaker_wav=speaker_arg,
+                            language=tts_language,
+                            file_path=output_audio_path
+                        )
+                    else:
+                        # Fallback if speaker_wav is missing
+                        tts_model.tts_to_file(
+                            text=assistant_response,
+                            language=tts_language,
+                            file_path=output_audio_path
+                        )
 
                 # Read audio file and convert to base64
                 with open(output_audio_path, "rb") as audio_file:
@@ -0,0 +1,107 @@
+from contextlib import nullcontext
+
+import torch
+from TTS.api import TTS
+from TTS.config.shared_configs import BaseDatasetConfig
+from TTS.tts.configs import xtts_config
+from TTS.tts.models.xtts import XttsAudioConfig, XttsArgs
+
+# XTTS loading and CPU inference modes, shared by maas_chat_interface.py and
+# benchmark_tts.py.
+#
+#   fp32           - the model exactly as Coqui ships it (previous behaviour)
+#   cpu_optimized  - int8 dynamic quantization of the GPT linear layers and
+#                    explicit thread counts; optionally runs the HiFi-GAN
+#                    vocoder in bfloat16
+
+XTTS_MODEL_NAME = "tts_models/multilingual/multi-dataset/xtts_v2"
+TTS_MODES = ("fp32", "cpu_optimized")
+
+# Add XttsConfig to safe globals for PyTorch 2.6+
+# This needs to be done before TTS model loading if PyTorch version is >= 2.6
+# and the model uses this config class.
+torch.serialization.add_safe_globals([xtts_config.XttsConfig])
+
+
+def set_cpu_threads(num_threads=None):
+    # Synthesis is one sequential request, so all cores go to intra-op work.
+    # None keeps torch's default (one thread per physical core).
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Can only be set before the first parallel op; keep the existing value
+        pass
+
+
+def _replace_conv1d_with_linear(module):
+    # The GPT-2 blocks inside XTTS use transformers' Conv1D (y = x @ W + b, W is
+    # in x out), which quantize_dynamic does not recognise. Swap each one for the
+    # equivalent nn.Linear so the attention and MLP projections get quantized too.
+    for name, child in module.named_children():
+        if type(child).__name__ == "Conv1D" and hasattr(child, "nf"):
+            linear = torch.nn.Linear(child.weight.shape[0], child.nf)
+            linear.weight.data = child.weight.data.t().contiguous()
+            linear.bias.data = child.bias.data
+            setattr(module, name, linear)
+        else:
+            _replace_conv1d_with_linear(child)
+
+
+def quantize_gpt(tts):
+    # Dynamic int8 quantization of the autoregressive GPT decoder, where almost
+    # all of the CPU time goes. Done in place so gpt_inference, which shares
+    # these modules, picks up the quantized layers as well.
+    gpt = tts.synthesizer.tts_model.gpt
+    _replace_conv1d_with_linear(gpt)
+    torch.ao.quantization.quantize_dynamic(gpt, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def use_bf16_vocoder(tts):
+    # Run the HiFi-GAN decoder under CPU autocast; output goes back to fp32 so
+    # the rest of the pipeline (and the written wav) is unchanged.
+    decoder = tts.synthesizer.tts_model.hifigan_decoder
+    forward = decoder.forward
+
+    def bf16_forward(*args, **kwargs):
+        with torch.autocast("cpu", dtype=torch.bfloat16):
+            return forward(*args, **kwargs).float()
+
+    decoder.forward = bf16_forward
+
+
+def load_xtts(mode="fp32", num_threads=None, bf16_vocoder=False, tune_threads=None):
+    # tune_threads defaults to on for cpu_optimized only; benchmark_tts.py turns
+    # it on for fp32 as well to separate thread tuning from the model changes
+    if mode not in TTS_MODES:
+        raise ValueError(f"Unknown TTS inference mode '{mode}'. Expected one of {TTS_MODES}.")
+
+    if tune_threads is None:
+        tune_threads = mode == "cpu_optimized"
+    if tune_threads:
+        # Before loading, so the inter-op pool has not been started yet
+        set_cpu_threads(num_threads)
+
+    # Use safe_globals context manager directly around the TTS model instantiation
+    with torch.serialization.safe_globals([
+        xtts_config.XttsConfig,
+        XttsAudioConfig,
+        BaseDatasetConfig,
+        XttsArgs
+    ]):
+        model = TTS(XTTS_MODEL_NAME, gpu=False)
+
+    if mode == "cpu_optimized":
+        quantize_gpt(model)
+        if bf16_vocoder:
+            use_bf16_vocoder(model)
+    return model
+
+
+def synthesis_context(mode):
+    # Wrap tts()/tts_to_file() calls with this. Coqui already decorates
+    # Xtts.inference / full_inference and the conditioning-latent methods with
+    # @torch.inference_mode(), so every mode runs in inference mode; this only
+    # makes it explicit for cpu_optimized and has no measurable effect.
+    return torch.inference_mode() if mode == "cpu_optimized" else nullcontext()
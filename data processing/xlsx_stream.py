@@ -0,0 +1,261 @@
+import os
+import posixpath
+import re
+import sqlite3
+import tempfile
+import zipfile
+import xml.etree.ElementTree as ET
+
+# Read-only streaming reader for .xlsx workbooks.
+#
+# pd.read_excel / ExcelFile.parse build the whole sheet as a DataFrame before any
+# processing starts, which spikes memory on exports with hundreds of thousands of
+# rows. This reader walks the sheet XML with iterparse and yields rows in
+# fixed-size chunks, so memory is bounded by the chunk size instead of the sheet.
+# The shared-strings table, which holds nearly every message body in a chat
+# export, is spilled to a temporary sqlite file so it does not grow memory with
+# the sheet either. That costs a one-off build of the table plus one batched
+# lookup per chunk, and only the columns the caller asks for (usecols) are
+# decoded and looked up at all.
+
+CHUNK_SIZE = 5000
+_LOOKUP_BATCH = 500  # Stays under SQLite's limit on bound parameters per query
+
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_CELL_REF = re.compile(r"([A-Z]+)")
+
+
+def _local(tag):
+    # Drop the XML namespace ("{...}row" -> "row"); covers both transitional and strict OOXML
+    return tag.rsplit("}", 1)[-1]
+
+
+def _column_index(cell_ref):
+    # "A1" -> 0, "C7" -> 2, "AA3" -> 26; None if the ref is not a cell address
+    match = _CELL_REF.match(cell_ref)
+    if match is None:
+        return None
+    letters = match.group(1)
+    index = 0
+    for letter in letters:
+        index = index * 26 + (ord(letter) - ord("A") + 1)
+    return index - 1
+
+
+def _text(elem):
+    # Text of an <si> or <is> item: its own <t> plus the <t> of each rich-text
+    # run <r>. Phonetic <rPh> runs (furigana Excel adds for CJK input) are skipped.
+    parts = []
+    for child in elem:
+        tag = _local(child.tag)
+        if tag == "t":
+            parts.append(child.text or "")
+        elif tag == "r":
+            parts.extend(t.text or "" for t in child if _local(t.tag) == "t")
+    return "".join(parts)
+
+
+def _number(value):
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    return int(number) if number.is_integer() else number
+
+
+class _SharedRef(int):
+    # Index into the shared-strings table, resolved a chunk at a time
+    pass
+
+
+def _cell_value(cell):
+    cell_type = cell.get("t")
+    if cell_type == "inlineStr":
+        for child in cell:
+            if _local(child.tag) == "is":
+                return _text(child)
+        return None
+    value = None
+    for child in cell:
+        if _local(child.tag) == "v":
+            value = child.text
+            break
+    if value is None:
+        return None
+    if cell_type == "s":
+        return _SharedRef(value)
+    if cell_type in ("str", "e", "d"):
+        # "d" is an ISO 8601 date; kept as text since no column we use holds dates
+        return value
+    if cell_type == "b":
+        return value == "1"
+    return _number(value)
+
+
+class _SharedStrings:
+    # On-disk index -> text table for sharedStrings.xml
+    def __init__(self, f):
+        fd, self.db_path = tempfile.mkstemp(suffix=".sqlite")
+        os.close(fd)
+        self.db = sqlite3.connect(self.db_path)
+        try:
+            self.db.execute("CREATE TABLE strings (idx INTEGER PRIMARY KEY, value TEXT)")
+            batch = []
+            count = 0
+            sst = None
+            for event, elem in ET.iterparse(f, events=("start", "end")):
+                tag = _local(elem.tag)
+                if event == "start":
+                    if tag == "sst":
+                        sst = elem
+                    continue
+                if tag != "si":
+                    continue
+                batch.append((count, _text(elem)))
+                count += 1
+                sst.clear()
+                if len(batch) >= CHUNK_SIZE:
+                    self.db.executemany("INSERT INTO strings VALUES (?, ?)", batch)
+                    batch = []
+            self.db.executemany("INSERT INTO strings VALUES (?, ?)", batch)
+            self.db.commit()
+        except Exception:
+            self.close()
+            raise
+
+    def lookup(self, indices):
+        indices = sorted(indices)
+        strings = {}
+        for start in range(0, len(indices), _LOOKUP_BATCH):
+            batch = indices[start:start + _LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            strings.update(self.db.execute(
+                f"SELECT idx, value FROM strings WHERE idx IN ({placeholders})", batch))
+        missing = [index for index in indices if index not in strings]
+        if missing:
+            raise IndexError(f"shared string index {missing[0]} out of range")
+        return strings
+
+    def close(self):
+        self.db.close()
+        os.remove(self.db_path)
+
+
+class XlsxStreamReader:
+    def __init__(self, path):
+        self.path = path
+        self.zip = zipfile.ZipFile(path)
+        self.shared_strings = None
+        try:
+            self.sheet_paths = self._load_sheet_paths()
+            self.sheet_names = list(self.sheet_paths)
+            if "xl/sharedStrings.xml" in self.zip.namelist():
+                with self.zip.open("xl/sharedStrings.xml") as f:
+                    self.shared_strings = _SharedStrings(f)
+        except Exception:
+            self.zip.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.shared_strings is not None:
+            self.shared_strings.close()
+        self.zip.close()
+
+    def _load_sheet_paths(self):
+        with self.zip.open("xl/_rels/workbook.xml.rels") as f:
+            targets = {rel.get("Id"): rel.get("Target") for rel in ET.parse(f).getroot()}
+        with self.zip.open("xl/workbook.xml") as f:
+            root = ET.parse(f).getroot()
+
+        sheet_paths = {}
+        for sheet in root.iter():
+            if _local(sheet.tag) != "sheet":
+                continue
+            target = targets[sheet.get(f"{_REL_NS}id")]
+            # Targets are relative to xl/ unless they start with "/"
+            if target.startswith("/"):
+                sheet_paths[sheet.get("name")] = target.lstrip("/")
+            else:
+                sheet_paths[sheet.get("name")] = posixpath.normpath(posixpath.join("xl", target))
+        return sheet_paths
+
+    def _resolve(self, rows):
+        # Swap shared-string refs for their text with one batched lookup
+        refs = {value for row in rows for value in row if isinstance(value, _SharedRef)}
+        if not refs:
+            return rows
+        if self.shared_strings is None:
+            raise IndexError("workbook has no shared strings table")
+        strings = self.shared_strings.lookup(refs)
+        return [
+            tuple(strings[value] if isinstance(value, _SharedRef) else value for value in row)
+            for row in rows
+        ]
+
+    def _iter_row_elements(self, sheet_name):
+        with self.zip.open(self.sheet_paths[sheet_name]) as f:
+            sheet_data = None
+            for event, elem in ET.iterparse(f, events=("start", "end")):
+                tag = _local(elem.tag)
+                if event == "start":
+                    if tag == "sheetData":
+                        sheet_data = elem
+                    continue
+                if tag != "row":
+                    continue
+                yield elem
+                # Drop rows already processed so the tree never grows with the sheet
+                sheet_data.clear()
+
+    @staticmethod
+    def _decode_row(row_elem, usecols=None):
+        # Missing cells within a row are None; so are cells outside usecols,
+        # which are never decoded
+        values = []
+        for cell in row_elem:
+            if _local(cell.tag) != "c":
+                continue
+            ref = cell.get("r")
+            index = _column_index(ref) if ref else None
+            if index is None or index < len(values):
+                index = len(values)
+            values.extend([None] * (index - len(values)))
+            values.append(_cell_value(cell) if usecols is None or index in usecols else None)
+        return tuple(values)
+
+    def iter_chunks(self, sheet_name, chunk_size=CHUNK_SIZE, usecols=None):
+        """Return (columns, chunks): header names plus an iterator of row lists.
+
+        usecols is an optional callable that receives the header names and
+        returns the column indices to decode; every other cell is None. Short
+        rows are padded to the header width. Blank headers are named
+        "Unnamed: <index>" to match pandas.
+        """
+        rows = self._iter_row_elements(sheet_name)
+        header_elem = next(rows, None)
+        header = () if header_elem is None else self._resolve([self._decode_row(header_elem)])[0]
+        columns = [
+            f"Unnamed: {i}" if value is None or str(value).strip() == "" else str(value).strip()
+            for i, value in enumerate(header)
+        ]
+        selected = None if usecols is None else set(usecols(columns))
+        return columns, self._chunk(rows, len(columns), chunk_size, selected)
+
+    def _chunk(self, rows, width, chunk_size, usecols):
+        chunk = []
+        for row_elem in rows:
+            row = self._decode_row(row_elem, usecols)
+            if len(row) < width:
+                row = row + (None,) * (width - len(row))
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield self._resolve(chunk)
+                chunk = []
+        if chunk:
+            yield self._resolve(chunk)